@@ -1,14 +1,27 @@
 #!/usr/bin/env python3
 import argparse
 import datetime
+import functools
+import hashlib
 import json
+import mmap
 import os
+import re
 import sys
+import tempfile
 import urllib.parse
 import urllib.request
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 BASE_URL = "https://newsdata.io/api/1/news"
 DEFAULT_OUTPUT = os.path.join("data", "newsdata_dump.json")
+DEFAULT_ARTICLES_OUTPUT = os.path.join("data", "newsdata_articles.jsonl")
+DUMP_SCHEMA_VERSION = "2.0"
+_DIGEST_RE = re.compile(r"[0-9a-f]{16}")
 ENV_KEY = "NEWSDATA_API_KEY"
 
 
@@ -16,9 +29,64 @@ def utc_now():
     return datetime.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
 
 
-def read_env_file(path):
+def json_loads(content):
+    if orjson is not None:
+        return orjson.loads(content)
+    if isinstance(content, memoryview):
+        content = content.tobytes()
+    return json.loads(content)
+
+
+def read_json_mapped(path):
+    # Parse straight from a read-only mapping; returns None for a blank file.
+    with open(path, "rb") as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as view:
+                try:
+                    return json_loads(view)
+                except json.JSONDecodeError:
+                    if not view.tobytes().strip():
+                        return None
+                    raise
+
+
+def json_dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=True).encode("utf-8")
+
+
+def write_json(path, data):
+    # Write to a sibling temp file and rename so a crash never leaves a truncated file.
+    handle = tempfile.NamedTemporaryFile(
+        "wb",
+        dir=os.path.dirname(path) or ".",
+        prefix=f".{os.path.basename(path)}.",
+        suffix=".tmp",
+        delete=False,
+    )
+    try:
+        with handle:
+            if orjson is not None:
+                handle.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE))
+            else:
+                handle.write(json.dumps(data, indent=2, ensure_ascii=True).encode("utf-8") + b"\n")
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.chmod(handle.name, 0o644)
+        os.replace(handle.name, path)
+    except BaseException:
+        os.remove(handle.name)
+        raise
+
+
+@functools.lru_cache(maxsize=8)
+def _parse_env_file(path):
+    values = {}
     if not os.path.exists(path):
-        return None
+        return values
     try:
         with open(path, "r", encoding="utf-8") as handle:
             for line in handle:
@@ -28,11 +96,14 @@ def read_env_file(path):
                 if "=" not in line:
                     continue
                 key, value = line.split("=", 1)
-                if key.strip() == ENV_KEY:
-                    return value.strip().strip("\"").strip("'")
+                values.setdefault(key.strip(), value.strip().strip("\"").strip("'"))
     except OSError:
-        return None
-    return None
+        return {}
+    return values
+
+
+def read_env_file(path):
+    return _parse_env_file(path).get(ENV_KEY)
 
 
 def load_api_key():
@@ -53,60 +124,80 @@ def load_api_key():
     return None
 
 
+def empty_dump():
+    return {
+        "schema_version": DUMP_SCHEMA_VERSION,
+        "updated_at": None,
+        "requests": [],
+        "known_keys": [],
+    }
+
+
 def load_dump(path):
     if not os.path.exists(path):
-        return {
-            "schema_version": "1.0",
-            "updated_at": None,
-            "articles": [],
-            "requests": [],
-        }
+        return empty_dump()
 
     try:
-        with open(path, "r", encoding="utf-8") as handle:
-            content = handle.read().strip()
-            if not content:
-                return {
-                    "schema_version": "1.0",
-                    "updated_at": None,
-                    "articles": [],
-                    "requests": [],
-                }
-            data = json.loads(content)
-    except (OSError, json.JSONDecodeError):
+        data = read_json_mapped(path)
+    except (OSError, ValueError):
         print(f"Failed to read or parse {path}", file=sys.stderr)
         sys.exit(1)
 
+    if data is None:
+        return empty_dump()
+
     if isinstance(data, list):
-        return {
-            "schema_version": "1.0",
-            "updated_at": None,
-            "articles": data,
-            "requests": [],
-        }
+        dump = empty_dump()
+        dump["articles"] = data
+        return dump
 
     if not isinstance(data, dict):
         print(f"Unexpected JSON format in {path}", file=sys.stderr)
         sys.exit(1)
 
-    data.setdefault("schema_version", "1.0")
+    data.setdefault("schema_version", DUMP_SCHEMA_VERSION)
     data.setdefault("updated_at", None)
-    data.setdefault("articles", [])
     data.setdefault("requests", [])
+    data.setdefault("known_keys", [])
 
-    if not isinstance(data["articles"], list):
-        data["articles"] = []
     if not isinstance(data["requests"], list):
         data["requests"] = []
+    if not isinstance(data["known_keys"], list):
+        data["known_keys"] = []
+    data["known_keys"] = [normalize_known_key(key) for key in data["known_keys"]]
+    if "articles" in data and not isinstance(data["articles"], list):
+        del data["articles"]
 
     return data
 
 
 def save_dump(path, data):
     os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
-    with open(path, "w", encoding="utf-8") as handle:
-        json.dump(data, handle, indent=2, ensure_ascii=True)
-        handle.write("\n")
+    write_json(path, data)
+
+
+def append_articles(path, articles):
+    if not articles:
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "ab") as handle:
+        for item in articles:
+            handle.write(json_dumps(item) + b"\n")
+
+
+def migrate_legacy_articles(dump, articles_path, known_keys):
+    # Older dumps stored every article inline; move them to the JSON-Lines file once.
+    legacy_articles = dump.pop("articles", None) or []
+    migrated = []
+    for item in legacy_articles:
+        key = key_hash(article_key(item))
+        if key in known_keys:
+            continue
+        known_keys.add(key)
+        dump["known_keys"].append(key)
+        migrated.append(item)
+    append_articles(articles_path, migrated)
+    return len(migrated)
 
 
 def article_key(item):
@@ -124,11 +215,43 @@ def article_key(item):
     return f"fallback:{title}|{pub_date}|{source}"
 
 
-def fetch_newsdata(params):
-    query = urllib.parse.urlencode(params)
-    url = f"{BASE_URL}?{query}"
+def key_hash(key):
+    # 64-bit digest keeps the dedupe set compact; collisions are negligible at archive scale.
+    # Stored as hex text because JSON readers that use doubles would round large integers.
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def normalize_known_key(key):
+    if isinstance(key, int):
+        # Earlier manifests stored the same digest as a little-endian unsigned integer.
+        return key.to_bytes(8, "little").hex()
+    key = str(key)
+    if _DIGEST_RE.fullmatch(key):
+        return key
+    return key_hash(key)
+
+
+def build_base_query(api_key, category, country, language, size):
+    return urllib.parse.urlencode(
+        {
+            "apikey": api_key,
+            "category": category,
+            "country": country,
+            "language": language,
+            "size": str(size),
+        }
+    )
+
+
+def fetch_newsdata(base_query, query=None, page=None):
+    # Only q and page vary between requests; the rest is encoded once by build_base_query.
+    url = f"{BASE_URL}?{base_query}"
+    if query:
+        url += f"&q={urllib.parse.quote_plus(query)}"
+    if page:
+        url += f"&page={urllib.parse.quote_plus(page)}"
     with urllib.request.urlopen(url, timeout=20) as response:
-        return json.load(response)
+        return json_loads(response.read())
 
 
 def parse_args():
@@ -139,7 +262,12 @@ def parse_args():
     parser.add_argument("--language", default="en", help="Language code (default: en)")
     parser.add_argument("--size", default=1, type=int, help="Number of items to fetch (default: 1)")
     parser.add_argument("--page", help="Pagination token (nextPage)")
-    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Output JSON path")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Output JSON path (request log + dedupe keys)")
+    parser.add_argument(
+        "--articles-output",
+        default=DEFAULT_ARTICLES_OUTPUT,
+        help="Append-only JSON-Lines path for articles",
+    )
     return parser.parse_args()
 
 
@@ -150,20 +278,12 @@ def main():
         print(f"Missing {ENV_KEY}. Set it in the environment or a .env file.", file=sys.stderr)
         sys.exit(1)
 
-    params = {
-        "apikey": api_key,
-        "category": args.category,
-        "country": args.country,
-        "language": args.language,
-        "size": str(args.size),
-    }
-    if args.query:
-        params["q"] = args.query
-    if args.page:
-        params["page"] = args.page
+    base_query = build_base_query(
+        api_key, args.category, args.country, args.language, args.size
+    )
 
     try:
-        response = fetch_newsdata(params)
+        response = fetch_newsdata(base_query, args.query, args.page)
     except Exception as exc:
         print(f"Request failed: {type(exc).__name__}: {exc}", file=sys.stderr)
         sys.exit(1)
@@ -176,44 +296,44 @@ def main():
     results = response.get("results") or []
     dump = load_dump(args.output)
 
-    existing_keys = set()
-    for item in dump.get("articles", []):
-        existing_keys.add(article_key(item))
+    existing_keys = set(dump["known_keys"])
+    migrated = migrate_legacy_articles(dump, args.articles_output, existing_keys)
+    if migrated:
+        print(f"Migrated {migrated} article(s) to {args.articles_output}")
 
     fetched_at = utc_now()
     added = 0
     skipped = 0
+    new_articles = []
+    query_params = {
+        "query": args.query,
+        "category": args.category,
+        "country": args.country,
+        "language": args.language,
+        "size": args.size,
+        "page": args.page,
+    }
 
     for item in results:
-        key = article_key(item)
+        key = key_hash(article_key(item))
         if key in existing_keys:
             skipped += 1
             continue
         item["fetched_at"] = fetched_at
-        item["query_params"] = {
-            "query": args.query,
-            "category": args.category,
-            "country": args.country,
-            "language": args.language,
-            "size": args.size,
-            "page": args.page,
-        }
-        dump["articles"].append(item)
+        item["query_params"] = query_params
+        new_articles.append(item)
         existing_keys.add(key)
+        dump["known_keys"].append(key)
         added += 1
 
+    append_articles(args.articles_output, new_articles)
+
+    dump["schema_version"] = DUMP_SCHEMA_VERSION
     dump["updated_at"] = fetched_at
     dump.setdefault("requests", []).append(
         {
             "fetched_at": fetched_at,
-            "params": {
-                "query": args.query,
-                "category": args.category,
-                "country": args.country,
-                "language": args.language,
-                "size": args.size,
-                "page": args.page,
-            },
+            "params": query_params,
             "status": response.get("status"),
             "total_results": response.get("totalResults"),
             "results_count": len(results),
@@ -225,7 +345,10 @@ def main():
 
     save_dump(args.output, dump)
 
-    print(f"Saved {added} new article(s), skipped {skipped}. Output: {args.output}")
+    print(
+        f"Saved {added} new article(s), skipped {skipped}. "
+        f"Output: {args.output}, {args.articles_output}"
+    )
 
 
 if __name__ == "__main__":
@@ -1,45 +1,58 @@
 #!/usr/bin/env python3
 import argparse
+import atexit
 import datetime
+import functools
 import hashlib
 import html
+import io
 import json
 import os
+import re
+import shutil
 import sys
-import urllib.error
-import urllib.request
-from html.parser import HTMLParser
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import feedparser
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from defusedxml.ElementTree import ParseError, iterparse
+except ImportError:
+    from xml.etree.ElementTree import ParseError, iterparse
 
 DEFAULT_CATALOG = os.path.join("feed_catalog", "rss_feeds.json")
 DEFAULT_OUTPUT = os.path.join("data", "rss_openai_daily.json")
 DEFAULT_ARCHIVE_DIR = os.path.join("data", "history")
+DEFAULT_FEED_STATE = os.path.join("data", "feed_state.json")
 OPENAI_ENDPOINT = "https://api.openai.com/v1/chat/completions"
 ENV_OPENAI_KEY = "OPENAI_API_KEY"
 ENV_OPENAI_MODEL = "OPENAI_MODEL"
 ENV_PATHS = [".env"]
+HTTP_POOL_SIZE = 32
+FETCH_WORKERS = 16
+OPENAI_BATCH_SIZE = 8
+OPENAI_WORKERS = 4
 
+_TAG_RE = re.compile(r"<[^>]+>")
 
-class _HTMLStripper(HTMLParser):
-    def __init__(self):
-        super().__init__()
-        self._parts = []
-
-    def handle_data(self, data):
-        if data:
-            self._parts.append(data)
-
-    def get_text(self):
-        return "".join(self._parts)
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE))
+SESSION.mount("http://", HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE))
+atexit.register(SESSION.close)
 
 
 def strip_html(value):
     if not value:
         return ""
-    parser = _HTMLStripper()
-    parser.feed(value)
-    text = parser.get_text()
+    text = _TAG_RE.sub("", value)
     return html.unescape(text).strip()
 
 
@@ -56,9 +69,58 @@ def utc_now():
     return datetime.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
 
 
-def read_env_file(path, key_name):
+def json_loads(content):
+    if orjson is not None:
+        return orjson.loads(content)
+    if isinstance(content, memoryview):
+        content = content.tobytes()
+    return json.loads(content)
+
+
+def json_dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=True).encode("utf-8")
+
+
+def write_json(path, data):
+    handle = tempfile.NamedTemporaryFile(
+        "wb",
+        dir=os.path.dirname(path) or ".",
+        prefix=f".{os.path.basename(path)}.",
+        suffix=".tmp",
+        delete=False,
+    )
+    try:
+        with handle:
+            if orjson is not None:
+                handle.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE))
+            else:
+                handle.write(json.dumps(data, indent=2, ensure_ascii=True).encode("utf-8") + b"\n")
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.chmod(handle.name, 0o644)
+        os.replace(handle.name, path)
+    except BaseException:
+        os.remove(handle.name)
+        raise
+
+
+def link_or_copy(src, dst):
+    # write_json replaces files rather than rewriting them, so a hard link stays a stable snapshot.
+    try:
+        if os.path.lexists(dst):
+            os.remove(dst)
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+@functools.lru_cache(maxsize=8)
+def _parse_env_file(path):
+    values = {}
     if not os.path.exists(path):
-        return None
+        return values
     try:
         with open(path, "r", encoding="utf-8") as handle:
             for line in handle:
@@ -68,11 +130,14 @@ def read_env_file(path, key_name):
                 if "=" not in line:
                     continue
                 key, value = line.split("=", 1)
-                if key.strip() == key_name:
-                    return value.strip().strip("\"").strip("'")
+                values.setdefault(key.strip(), value.strip().strip("\"").strip("'"))
     except OSError:
-        return None
-    return None
+        return {}
+    return values
+
+
+def read_env_file(path, key_name):
+    return _parse_env_file(path).get(key_name)
 
 
 def load_env_value(key_name):
@@ -91,13 +156,25 @@ def load_env_value(key_name):
 
 def load_catalog(path):
     try:
-        with open(path, "r", encoding="utf-8") as handle:
-            return json.load(handle)
+        with open(path, "rb") as handle:
+            return json_loads(handle.read())
     except (OSError, json.JSONDecodeError) as exc:
         print(f"Failed to load catalog {path}: {exc}", file=sys.stderr)
         sys.exit(1)
 
 
+def load_feed_state(path):
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "rb") as handle:
+            data = json_loads(handle.read())
+    except (OSError, json.JSONDecodeError) as exc:
+        print(f"Ignoring unreadable feed state {path}: {exc}", file=sys.stderr)
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
 def select_feeds(catalog, max_sources, feeds_per_source, source_ids):
     feeds = []
     selected_sources = 0
@@ -124,47 +201,163 @@ def select_feeds(catalog, max_sources, feeds_per_source, source_ids):
 
 def item_id(source_id, link, title):
     base = (link or title or "").strip()
-    digest = hashlib.sha1(f"{source_id}:{base}".encode("utf-8")).hexdigest()
-    return digest[:12]
+    return hashlib.blake2b(f"{source_id}:{base}".encode("utf-8"), digest_size=6).hexdigest()
+
+
+_ATOM_NS = "{http://www.w3.org/2005/Atom}"
+_RSS1_NS = "{http://purl.org/rss/1.0/}"
+_CONTENT_NS = "{http://purl.org/rss/1.0/modules/content/}"
+_DC_NS = "{http://purl.org/dc/elements/1.1/}"
+
+# Full {namespace}local tags, so media:title, itunes:summary and the like never match.
+_ENTRY_TAGS = {"item", _RSS1_NS + "item", _ATOM_NS + "entry"}
+_LINK_TAGS = {"link", _RSS1_NS + "link", _ATOM_NS + "link"}
+_FIELD_TAGS = {
+    "title": "title",
+    _RSS1_NS + "title": "title",
+    _ATOM_NS + "title": "title",
+    _ATOM_NS + "summary": "summary",
+    "description": "summary",
+    _RSS1_NS + "description": "summary",
+    _ATOM_NS + "content": "content",
+    _CONTENT_NS + "encoded": "content",
+    "pubDate": "published",
+    _ATOM_NS + "published": "published",
+    _ATOM_NS + "updated": "updated",
+    _DC_NS + "date": "updated",
+}
+
+
+def _entry_link(elem):
+    fallback = ""
+    for child in elem:
+        if child.tag not in _LINK_TAGS:
+            continue
+        text = (child.text or "").strip()
+        if text:
+            return text
+        href = child.get("href") or ""
+        if child.get("rel", "alternate") == "alternate" and href:
+            return href
+        fallback = fallback or href
+    if fallback:
+        return fallback
+    for child in elem:
+        if child.tag == "guid" and child.get("isPermaLink", "true") != "false":
+            return (child.text or "").strip()
+    return ""
 
 
-def fetch_feed_items(feed, max_items, timeout, user_agent):
-    items = []
-    request = urllib.request.Request(
+def _parse_rss_atom(content, max_items):
+    """Stream RSS/RDF items or Atom entries, stopping after max_items."""
+    entries = []
+    if max_items <= 0:
+        return entries
+    for _, elem in iterparse(io.BytesIO(content), events=("end",)):
+        if elem.tag not in _ENTRY_TAGS:
+            continue
+        fields = {}
+        for child in elem:
+            name = _FIELD_TAGS.get(child.tag)
+            if name and name not in fields:
+                text = "".join(child.itertext()).strip()
+                if text:
+                    fields[name] = text
+        entries.append(
+            {
+                "title": fields.get("title", ""),
+                "link": _entry_link(elem),
+                "summary": fields.get("summary", ""),
+                "description": fields.get("content", ""),
+                "published": fields.get("published", ""),
+                "updated": fields.get("updated", ""),
+            }
+        )
+        elem.clear()
+        if len(entries) >= max_items:
+            break
+    return entries
+
+
+def content_digest(item):
+    # Without a summary, a title alone ("Live updates") is too weak to call two stories the same.
+    if not item["summary"]:
+        return None
+    text = f"{item['title']}\0{item['summary']}"
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+
+
+def build_item(feed, entry):
+    return {
+        "id": item_id(feed["source_id"], entry["link"], entry["title"]),
+        "title": entry["title"],
+        "link": entry["link"],
+        "summary": entry["summary"],
+        "published": entry["published"],
+        "source_id": feed["source_id"],
+        "source_name": feed["source_name"],
+        "feed_name": feed["feed_name"],
+        "feed_url": feed["feed_url"],
+        "topic_tags": feed["topic_tags"],
+    }
+
+
+def fetch_feed_items(feed, max_items, timeout, user_agent, cached=None):
+    headers = {"User-Agent": user_agent}
+    # Only revalidate when the cached entries cover the requested item count.
+    if cached and cached.get("max_items", 0) >= max_items:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+    else:
+        cached = None
+
+    response = SESSION.get(
         feed["feed_url"],
-        headers={"User-Agent": user_agent},
+        headers=headers,
+        timeout=timeout,
     )
-    with urllib.request.urlopen(request, timeout=timeout) as response:
-        content = response.read()
-
-    parsed = feedparser.parse(content)
-    if parsed.bozo and not parsed.entries:
-        exc = parsed.bozo_exception
-        raise RuntimeError(f"Feed parse error: {exc}")
-
-    for entry in parsed.entries[:max_items]:
-        title = compact_text((entry.get("title") or "").strip(), 200)
-        link = (entry.get("link") or "").strip()
-        summary = compact_text(
-            strip_html(entry.get("summary") or entry.get("description") or ""),
-            500,
-        )
-        published = (entry.get("published") or entry.get("updated") or "").strip()
-        items.append(
+    if response.status_code == 304 and cached:
+        entries = cached.get("entries") or []
+        return [build_item(feed, entry) for entry in entries[:max_items]], cached
+    response.raise_for_status()
+    content = response.content
+
+    try:
+        raw_entries = _parse_rss_atom(content, max_items)
+    except (ParseError, ValueError):
+        raw_entries = []
+
+    # Fall back to feedparser for malformed or unusual feeds.
+    if not raw_entries:
+        parsed = feedparser.parse(content)
+        if parsed.bozo and not parsed.entries:
+            exc = parsed.bozo_exception
+            raise RuntimeError(f"Feed parse error: {exc}")
+        raw_entries = parsed.entries[:max_items]
+
+    entries = []
+    for entry in raw_entries:
+        entries.append(
             {
-                "id": item_id(feed["source_id"], link, title),
-                "title": title,
-                "link": link,
-                "summary": summary,
-                "published": published,
-                "source_id": feed["source_id"],
-                "source_name": feed["source_name"],
-                "feed_name": feed["feed_name"],
-                "feed_url": feed["feed_url"],
-                "topic_tags": feed["topic_tags"],
+                "title": compact_text((entry.get("title") or "").strip(), 200),
+                "link": (entry.get("link") or "").strip(),
+                "summary": compact_text(
+                    strip_html(entry.get("summary") or entry.get("description") or ""),
+                    500,
+                ),
+                "published": (entry.get("published") or entry.get("updated") or "").strip(),
             }
         )
-    return items
+
+    state = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "max_items": max_items,
+        "entries": entries,
+    }
+    return [build_item(feed, entry) for entry in entries], state
 
 
 def build_openai_messages(items):
@@ -188,7 +381,7 @@ def build_openai_messages(items):
     user = (
         "Return JSON with an 'items' array. Each array item must include: "
         "id, summary, tags (array of short strings). Only return JSON.\n"
-        + json.dumps(payload, ensure_ascii=True)
+        + json.dumps(payload, ensure_ascii=False)
     )
     return [{"role": "system", "content": system}, {"role": "user", "content": user}]
 
@@ -212,21 +405,24 @@ def call_openai(api_key, model, items, timeout):
         "temperature": 0.2,
         "response_format": {"type": "json_object"},
     }
-    data = json.dumps(payload).encode("utf-8")
-    request = urllib.request.Request(
-        OPENAI_ENDPOINT,
-        data=data,
-        headers={
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-        },
-    )
     try:
-        with urllib.request.urlopen(request, timeout=timeout) as response:
-            result = json.load(response)
-    except urllib.error.HTTPError as exc:
-        body = exc.read().decode("utf-8", errors="replace")
-        raise RuntimeError(f"OpenAI HTTP {exc.code}: {body}") from exc
+        response = SESSION.post(
+            OPENAI_ENDPOINT,
+            data=json_dumps(payload),
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json",
+            },
+            timeout=timeout,
+        )
+    except Exception as exc:
+        raise RuntimeError(f"OpenAI request failed: {type(exc).__name__}: {exc}") from exc
+
+    if not response.ok:
+        raise RuntimeError(f"OpenAI HTTP {response.status_code}: {response.text}")
+
+    try:
+        result = json_loads(response.content)
     except Exception as exc:
         raise RuntimeError(f"OpenAI request failed: {type(exc).__name__}: {exc}") from exc
 
@@ -240,25 +436,48 @@ def call_openai(api_key, model, items, timeout):
         raise RuntimeError("OpenAI returned empty content.")
 
     try:
-        parsed = json.loads(raw)
+        parsed = json_loads(raw)
     except json.JSONDecodeError as exc:
         raise RuntimeError(f"Failed to parse OpenAI JSON: {exc}") from exc
 
     return parsed, result.get("id"), result.get("usage")
 
 
+def merge_usage(usages):
+    merged = {}
+    for usage in usages:
+        for key, value in (usage or {}).items():
+            if isinstance(value, dict):
+                merged[key] = merge_usage([merged.get(key), value])
+            elif isinstance(value, (int, float)):
+                merged[key] = merged.get(key, 0) + value
+    return merged or None
+
+
 def parse_args():
     parser = argparse.ArgumentParser(description="Fetch RSS feeds, summarize with OpenAI, write JSON.")
     parser.add_argument("--catalog", default=DEFAULT_CATALOG, help="Path to rss_feeds.json")
     parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Output JSON path")
     parser.add_argument("--archive-dir", default=DEFAULT_ARCHIVE_DIR, help="Archive directory")
     parser.add_argument("--no-archive", action="store_true", help="Disable archive copy")
+    parser.add_argument(
+        "--feed-state",
+        default=DEFAULT_FEED_STATE,
+        help="ETag/Last-Modified cache for conditional feed requests",
+    )
+    parser.add_argument("--no-feed-state", action="store_true", help="Disable conditional feed requests")
     parser.add_argument("--max-sources", type=int, default=10, help="Max number of sources")
     parser.add_argument("--feeds-per-source", type=int, default=1, help="Feeds per source")
     parser.add_argument("--max-items-per-feed", type=int, default=3, help="Items per feed")
     parser.add_argument("--timeout", type=int, default=30, help="HTTP timeout seconds")
     parser.add_argument("--source-ids", help="Comma-separated source IDs to include")
     parser.add_argument("--openai-model", help="OpenAI model override")
+    parser.add_argument(
+        "--openai-batch-size",
+        type=int,
+        default=OPENAI_BATCH_SIZE,
+        help="Items per OpenAI request (batches run concurrently)",
+    )
     parser.add_argument("--skip-openai", action="store_true", help="Skip OpenAI call")
     return parser.parse_args()
 
@@ -279,28 +498,109 @@ def main():
     errors = []
     seen = set()
     user_agent = "RSS_Feeds/1.0 (+https://github.com)"
+    feed_state = {} if args.no_feed_state else load_feed_state(args.feed_state)
 
-    for feed in feeds:
-        try:
-            feed_items = fetch_feed_items(
-                feed, args.max_items_per_feed, args.timeout, user_agent
+    api_key = None
+    model = None
+    if not args.skip_openai:
+        api_key = load_env_value(ENV_OPENAI_KEY)
+        model = args.openai_model or load_env_value(ENV_OPENAI_MODEL) or "gpt-4o-mini"
+    batch_size = max(args.openai_batch_size, 1)
+    pending = []
+    batch_futures = []
+    link_reps = {}
+    content_reps = {}
+    rep_ids = {}
+    outcomes = [None] * len(feeds)
+
+    with ThreadPoolExecutor(
+        max_workers=min(FETCH_WORKERS, len(feeds))
+    ) as fetch_executor, ThreadPoolExecutor(max_workers=OPENAI_WORKERS) as openai_executor:
+        futures = {
+            fetch_executor.submit(
+                fetch_feed_items,
+                feed,
+                args.max_items_per_feed,
+                args.timeout,
+                user_agent,
+                feed_state.get(feed["feed_url"]),
+            ): index
+            for index, feed in enumerate(feeds)
+        }
+
+        # Queue items for OpenAI as each feed finishes, whatever its catalog position.
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                feed_items, feed_state[feeds[index]["feed_url"]] = future.result()
+            except Exception as exc:
+                outcomes[index] = exc
+                continue
+            outcomes[index] = feed_items
+
+            for item in feed_items:
+                item["fetched_at"] = fetched_at
+                # Repeated links and syndicated copies of one story are summarized once.
+                # Only representatives are registered, so groups never chain through members.
+                dedupe_key = item["link"] or item["title"] or item["id"]
+                digest = content_digest(item)
+                rep = link_reps.get(dedupe_key)
+                if rep is None and digest:
+                    rep = content_reps.get(digest)
+                if rep is None:
+                    rep = item
+                    link_reps[dedupe_key] = item
+                    if digest:
+                        content_reps[digest] = item
+                    pending.append(item)
+                # Keyed by object identity: items from different feeds can share an id.
+                rep_ids[id(item)] = rep["id"]
+
+            while api_key and len(pending) >= batch_size:
+                batch, pending = pending[:batch_size], pending[batch_size:]
+                batch_futures.append(
+                    (
+                        batch,
+                        openai_executor.submit(call_openai, api_key, model, batch, args.timeout),
+                    )
+                )
+
+        if api_key and pending:
+            batch_futures.append(
+                (
+                    pending,
+                    openai_executor.submit(call_openai, api_key, model, pending, args.timeout),
+                )
             )
-        except Exception as exc:
+        # A failed batch is recorded instead of discarding the others.
+        results = []
+        batch_errors = []
+        for batch, future in batch_futures:
+            try:
+                results.append(future.result())
+            except Exception as exc:
+                # Batches form in fetch-completion order, so identify them by item ids.
+                batch_errors.append(
+                    {"item_ids": [item["id"] for item in batch], "error": str(exc)}
+                )
+
+    # Join in catalog order so output and dedupe stay deterministic.
+    for feed, outcome in zip(feeds, outcomes):
+        if isinstance(outcome, Exception):
             errors.append(
                 {
                     "feed_url": feed["feed_url"],
                     "source_id": feed["source_id"],
-                    "error": str(exc),
+                    "error": str(outcome),
                 }
             )
             continue
 
-        for item in feed_items:
+        for item in outcome:
             dedupe_key = item["link"] or item["title"] or item["id"]
             if dedupe_key in seen:
                 continue
             seen.add(dedupe_key)
-            item["fetched_at"] = fetched_at
             items.append(item)
 
     output = {
@@ -319,35 +619,43 @@ def main():
     }
 
     if items and not args.skip_openai:
-        api_key = load_env_value(ENV_OPENAI_KEY)
         if not api_key:
             print(f"Missing {ENV_OPENAI_KEY}.", file=sys.stderr)
             sys.exit(1)
-        model = args.openai_model or load_env_value(ENV_OPENAI_MODEL) or "gpt-4o-mini"
+        if batch_futures and not results:
+            for batch_error in batch_errors:
+                print(batch_error["error"], file=sys.stderr)
+            print("All OpenAI batches failed; nothing written.", file=sys.stderr)
+            sys.exit(1)
 
-        parsed, response_id, usage = call_openai(api_key, model, items, args.timeout)
         mapping = {}
-        for result_item in parsed.get("items") or []:
-            item_key = result_item.get("id")
-            if item_key:
-                mapping[item_key] = result_item
+        for parsed, _, _ in results:
+            for result_item in parsed.get("items") or []:
+                item_key = result_item.get("id")
+                if item_key:
+                    mapping[item_key] = result_item
 
         for item in items:
-            ai = mapping.get(item["id"])
+            ai = mapping.get(rep_ids.get(id(item), item["id"]))
             if ai:
                 item["ai_summary"] = ai.get("summary")
                 item["ai_tags"] = ai.get("tags") or []
 
+        response_ids = [response_id for _, response_id, _ in results]
         output["openai"] = {
             "model": model,
-            "response_id": response_id,
-            "usage": usage,
+            "response_id": response_ids[0] if response_ids else None,
+            "response_ids": response_ids,
+            "usage": merge_usage([usage for _, _, usage in results]),
+            "errors": batch_errors,
         }
 
     os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
-    with open(args.output, "w", encoding="utf-8") as handle:
-        json.dump(output, handle, indent=2, ensure_ascii=True)
-        handle.write("\n")
+    write_json(args.output, output)
+
+    if not args.no_feed_state and args.feed_state:
+        os.makedirs(os.path.dirname(args.feed_state) or ".", exist_ok=True)
+        write_json(args.feed_state, feed_state)
 
     if not args.no_archive and args.archive_dir:
         date_stamp = fetched_at[:10]
@@ -355,13 +663,16 @@ def main():
         archive_name = f"{base_name}_{date_stamp}.json"
         archive_path = os.path.join(args.archive_dir, archive_name)
         os.makedirs(args.archive_dir, exist_ok=True)
-        with open(archive_path, "w", encoding="utf-8") as handle:
-            json.dump(output, handle, indent=2, ensure_ascii=True)
-            handle.write("\n")
+        link_or_copy(args.output, archive_path)
 
     print(f"Wrote {len(items)} items to {args.output}")
     if errors:
         print(f"Encountered {len(errors)} feed errors.", file=sys.stderr)
+    if batch_errors:
+        print(
+            f"{len(batch_errors)} of {len(batch_futures)} OpenAI batches failed.",
+            file=sys.stderr,
+        )
 
 
 if __name__ == "__main__":